@@ -10,7 +10,7 @@ from schema import AgentInfo
 DEFAULT_AGENT = "research-assistant"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Agent:
     description: str
     graph: CompiledStateGraph
@@ -23,10 +23,10 @@ class Task:
             type=self.name,
             data=task_data.model_dump(),
         )
-        await task_custom_data.adispatch(config)
-        return task_custom_data.to_langchain()
+        return await task_custom_data.adispatch(config)
 
-    async def start(self, config: RunnableConfig, data: dict = {}) -> BaseMessage:
+    async def start(self, config: RunnableConfig, data: dict | None = None) -> BaseMessage:
+        data = data or {}
         self.state = "new"
         task_message = await self._generate_and_dispatch_message(config, data)
         return task_message
@@ -39,8 +39,9 @@ class Task:
         return task_message
 
     async def finish(
-        self, result: Literal["success", "error"], config: RunnableConfig, data: dict = {}
+        self, result: Literal["success", "error"], config: RunnableConfig, data: dict | None = None
     ) -> BaseMessage:
+        data = data or {}
         self.state = "complete"
         self.result = result
         task_message = await self._generate_and_dispatch_message(config, data)
@@ -1,7 +1,8 @@
+import hashlib
+from collections import OrderedDict
 from enum import Enum
 
 from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
-from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel, Field
 
 from core import get_model, settings
@@ -39,6 +40,9 @@ unsafe_content_categories = {
 }
 
 categories_str = "\n".join([f"{k}: {v}" for k, v in unsafe_content_categories.items()])
+readable_categories = {k: v.rstrip(".") for k, v in unsafe_content_categories.items()}
+
+role_mapping = {"ai": "Agent", "human": "User"}
 
 llama_guard_instructions = f"""
 Task: Check if there is unsafe content in '{{role}}' messages in conversations according to our safety policy with the below categories.
@@ -61,20 +65,47 @@ Provide your safety assessment for ONLY THE LAST {{role}} in the above conversat
 def parse_llama_guard_output(output: str) -> LlamaGuardOutput:
     if output == "safe":
         return LlamaGuardOutput(safety_assessment=SafetyAssessment.SAFE)
-    parsed_output = output.split("\n")
+    if not output.startswith("unsafe"):
+        return LlamaGuardOutput(safety_assessment=SafetyAssessment.ERROR)
+    parsed_output = output.splitlines()
     if len(parsed_output) != 2 or parsed_output[0] != "unsafe":
         return LlamaGuardOutput(safety_assessment=SafetyAssessment.ERROR)
     try:
         categories = parsed_output[1].split(",")
-        readable_categories = [unsafe_content_categories[c.strip()].strip(".") for c in categories]
         return LlamaGuardOutput(
             safety_assessment=SafetyAssessment.UNSAFE,
-            unsafe_categories=readable_categories,
+            unsafe_categories=[readable_categories[c.strip()] for c in categories],
         )
     except KeyError:
         return LlamaGuardOutput(safety_assessment=SafetyAssessment.ERROR)
 
 
+# Llama Guard runs at temperature 0, so the verdict for an identical compiled prompt
+# (role, categories and full conversation) can be reused instead of calling the model again.
+VERDICT_CACHE_SIZE = 1024
+_verdict_cache: OrderedDict[str, LlamaGuardOutput] = OrderedDict()
+
+
+def _prompt_key(compiled_prompt: str) -> str:
+    return hashlib.sha256(compiled_prompt.encode()).hexdigest()
+
+
+def _get_cached_verdict(key: str) -> LlamaGuardOutput | None:
+    output = _verdict_cache.get(key)
+    if output is not None:
+        _verdict_cache.move_to_end(key)
+    return output
+
+
+def _cache_verdict(key: str, output: LlamaGuardOutput) -> None:
+    # Don't cache parse errors, they may be transient
+    if output.safety_assessment == SafetyAssessment.ERROR:
+        return
+    _verdict_cache[key] = output
+    if len(_verdict_cache) > VERDICT_CACHE_SIZE:
+        _verdict_cache.popitem(last=False)
+
+
 class LlamaGuard:
     def __init__(self) -> None:
         if settings.GROQ_API_KEY is None:
@@ -82,29 +113,45 @@ class LlamaGuard:
             self.model = None
             return
         self.model = get_model(GroqModelName.LLAMA_GUARD_3_8B).with_config(tags=["llama_guard"])
-        self.prompt = PromptTemplate.from_template(llama_guard_instructions)
+
+    def _needs_check(self, messages: list[AnyMessage]) -> bool:
+        # Only user and agent messages are assessed, and each of them is checked when it is
+        # added. If the latest message is anything else (e.g. a tool result) there is
+        # nothing new to check.
+        return self.model is not None and bool(messages) and messages[-1].type in role_mapping
 
     def _compile_prompt(self, role: str, messages: list[AnyMessage]) -> str:
-        role_mapping = {"ai": "Agent", "human": "User"}
         messages_str = [
-            f"{role_mapping[m.type]}: {m.content}" for m in messages if m.type in ["ai", "human"]
+            f"{role_mapping[m.type]}: {m.content}" for m in messages if m.type in role_mapping
         ]
         conversation_history = "\n\n".join(messages_str)
-        return self.prompt.format(role=role, conversation_history=conversation_history)
+        # The categories are already rendered into the instructions, so a plain str.format
+        # is enough here and avoids PromptTemplate's validation overhead on every check.
+        return llama_guard_instructions.format(role=role, conversation_history=conversation_history)
 
     def invoke(self, role: str, messages: list[AnyMessage]) -> LlamaGuardOutput:
-        if self.model is None:
+        if not self._needs_check(messages):
             return LlamaGuardOutput(safety_assessment=SafetyAssessment.SAFE)
         compiled_prompt = self._compile_prompt(role, messages)
+        key = _prompt_key(compiled_prompt)
+        if cached := _get_cached_verdict(key):
+            return cached
         result = self.model.invoke([HumanMessage(content=compiled_prompt)])
-        return parse_llama_guard_output(result.content)
+        output = parse_llama_guard_output(result.content)
+        _cache_verdict(key, output)
+        return output
 
     async def ainvoke(self, role: str, messages: list[AnyMessage]) -> LlamaGuardOutput:
-        if self.model is None:
+        if not self._needs_check(messages):
             return LlamaGuardOutput(safety_assessment=SafetyAssessment.SAFE)
         compiled_prompt = self._compile_prompt(role, messages)
+        key = _prompt_key(compiled_prompt)
+        if cached := _get_cached_verdict(key):
+            return cached
         result = await self.model.ainvoke([HumanMessage(content=compiled_prompt)])
-        return parse_llama_guard_output(result.content)
+        output = parse_llama_guard_output(result.content)
+        _cache_verdict(key, output)
+        return output
 
 
 if __name__ == "__main__":
@@ -1,11 +1,14 @@
-from datetime import datetime
+import asyncio
+from datetime import date
+from functools import cache, lru_cache
 from typing import Literal
 
 from langchain_community.tools import DuckDuckGoSearchResults, OpenWeatherMapQueryRun
 from langchain_community.utilities import OpenWeatherMapAPIWrapper
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig, RunnableLambda, RunnableSerializable
+from langchain_core.runnables.config import merge_configs
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, MessagesState, StateGraph
 from langgraph.managed import RemainingSteps
@@ -13,7 +16,9 @@ from langgraph.prebuilt import ToolNode
 
 from agents.llama_guard import LlamaGuard, LlamaGuardOutput, SafetyAssessment
 from agents.tools import calculator
+from agents.utils import TokenBuffer
 from core import get_model, settings
+from schema.models import AllModelEnum
 
 
 class AgentState(MessagesState, total=False):
@@ -37,8 +42,10 @@ if settings.OPENWEATHERMAP_API_KEY:
     )
     tools.append(OpenWeatherMapQueryRun(name="Weather", api_wrapper=wrapper))
 
-current_date = datetime.now().strftime("%B %d, %Y")
-instructions = f"""
+# LlamaGuard holds no per-request state, so share one instance across all calls
+llama_guard = LlamaGuard()
+
+instructions = """
     You are a helpful research assistant with the ability to search the web and use other tools.
     Today's date is {current_date}.
 
@@ -52,15 +59,28 @@ instructions = f"""
     """
 
 
+@lru_cache(maxsize=1)
+def get_system_message(today: date) -> SystemMessage:
+    # Cached per day so the prompt date stays current in a long-running service
+    current_date = today.strftime("%B %d, %Y")
+    return SystemMessage(content=instructions.format(current_date=current_date))
+
+
 def wrap_model(model: BaseChatModel) -> RunnableSerializable[AgentState, AIMessage]:
     model = model.bind_tools(tools)
     preprocessor = RunnableLambda(
-        lambda state: [SystemMessage(content=instructions)] + state["messages"],
+        lambda state: [get_system_message(date.today()), *state["messages"]],
         name="StateModifier",
     )
     return preprocessor | model
 
 
+@cache
+def get_model_runnable(model_name: AllModelEnum) -> RunnableSerializable[AgentState, AIMessage]:
+    # bind_tools() converts every tool to a provider schema, so only do it once per model
+    return wrap_model(get_model(model_name))
+
+
 def format_safety_message(safety: LlamaGuardOutput) -> AIMessage:
     content = (
         f"This conversation was flagged for unsafe content: {', '.join(safety.unsafe_categories)}"
@@ -68,13 +88,54 @@ def format_safety_message(safety: LlamaGuardOutput) -> AIMessage:
     return AIMessage(content=content)
 
 
+async def acall_model_with_input_check(
+    model_runnable: RunnableSerializable[AgentState, AIMessage],
+    state: AgentState,
+    config: RunnableConfig,
+) -> tuple[LlamaGuardOutput, AIMessage | None]:
+    """
+    Check the latest user input with LlamaGuard while the model is already running.
+
+    The model's tokens are held back until the input is assessed as safe. If it is unsafe,
+    or the check fails, the model call is cancelled and nothing is streamed.
+    """
+    token_buffer = TokenBuffer(config)
+    model_config = merge_configs(
+        config, RunnableConfig(callbacks=[token_buffer], tags=["hold_tokens"])
+    )
+    model_task = asyncio.create_task(model_runnable.ainvoke(state, model_config))
+    try:
+        input_safety = await llama_guard.ainvoke("User", state["messages"])
+        if input_safety.safety_assessment == SafetyAssessment.UNSAFE:
+            response = None
+        else:
+            await token_buffer.release()
+            response = await model_task
+    except BaseException:
+        # Don't leave the model running unattended if the check fails or the node is
+        # cancelled (e.g. the client disconnected).
+        model_task.cancel()
+        await asyncio.gather(model_task, return_exceptions=True)
+        raise
+
+    if response is None:
+        model_task.cancel()
+        await asyncio.gather(model_task, return_exceptions=True)
+    return input_safety, response
+
+
 async def acall_model(state: AgentState, config: RunnableConfig) -> AgentState:
-    m = get_model(config["configurable"].get("model", settings.DEFAULT_MODEL))
-    model_runnable = wrap_model(m)
-    response = await model_runnable.ainvoke(state, config)
+    model_runnable = get_model_runnable(config["configurable"].get("model", settings.DEFAULT_MODEL))
+
+    # New user input is checked alongside the model call rather than before it
+    if isinstance(state["messages"][-1], HumanMessage):
+        input_safety, response = await acall_model_with_input_check(model_runnable, state, config)
+        if response is None:
+            return {"messages": [format_safety_message(input_safety)], "safety": input_safety}
+    else:
+        response = await model_runnable.ainvoke(state, config)
 
     # Run llama guard check here to avoid returning the message if it's unsafe
-    llama_guard = LlamaGuard()
     safety_output = await llama_guard.ainvoke("Agent", state["messages"] + [response])
     if safety_output.safety_assessment == SafetyAssessment.UNSAFE:
         return {"messages": [format_safety_message(safety_output)], "safety": safety_output}
@@ -86,48 +147,18 @@ async def acall_model(state: AgentState, config: RunnableConfig) -> AgentState:
                     id=response.id,
                     content="Sorry, need more steps to process this request.",
                 )
-            ]
+            ],
+            "safety": safety_output,
         }
     # We return a list, because this will get added to the existing list
-    return {"messages": [response]}
-
-
-async def llama_guard_input(state: AgentState, config: RunnableConfig) -> AgentState:
-    llama_guard = LlamaGuard()
-    safety_output = await llama_guard.ainvoke("User", state["messages"])
-    return {"safety": safety_output}
-
-
-async def block_unsafe_content(state: AgentState, config: RunnableConfig) -> AgentState:
-    safety: LlamaGuardOutput = state["safety"]
-    return {"messages": [format_safety_message(safety)]}
+    return {"messages": [response], "safety": safety_output}
 
 
 # Define the graph
 agent = StateGraph(AgentState)
 agent.add_node("model", acall_model)
 agent.add_node("tools", ToolNode(tools))
-agent.add_node("guard_input", llama_guard_input)
-agent.add_node("block_unsafe_content", block_unsafe_content)
-agent.set_entry_point("guard_input")
-
-
-# Check for unsafe input and block further processing if found
-def check_safety(state: AgentState) -> Literal["unsafe", "safe"]:
-    safety: LlamaGuardOutput = state["safety"]
-    match safety.safety_assessment:
-        case SafetyAssessment.UNSAFE:
-            return "unsafe"
-        case _:
-            return "safe"
-
-
-agent.add_conditional_edges(
-    "guard_input", check_safety, {"unsafe": "block_unsafe_content", "safe": "model"}
-)
-
-# Always END after blocking unsafe content
-agent.add_edge("block_unsafe_content", END)
+agent.set_entry_point("model")
 
 # Always run "model" after "tools"
 agent.add_edge("tools", "model")
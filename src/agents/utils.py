@@ -1,6 +1,7 @@
+from collections import deque
 from typing import Any
 
-from langchain_core.callbacks import adispatch_custom_event
+from langchain_core.callbacks import AsyncCallbackHandler, adispatch_custom_event
 from langchain_core.messages import ChatMessage
 from langchain_core.runnables import RunnableConfig
 from langchain_core.runnables.config import merge_configs
@@ -19,12 +20,54 @@ class CustomData(BaseModel):
     def to_langchain(self) -> ChatMessage:
         return ChatMessage(content=[self.data], role="custom")
 
-    async def adispatch(self, config: RunnableConfig | None = None) -> None:
+    async def adispatch(self, config: RunnableConfig | None = None) -> ChatMessage:
+        """Dispatch the data as a custom event and return the message that was sent."""
         dispatch_config = RunnableConfig(
             tags=["custom_data_dispatch"],
         )
+        message = self.to_langchain()
         await adispatch_custom_event(
             name=self.type,
-            data=self.to_langchain(),
+            data=message,
             config=merge_configs(config, dispatch_config),
         )
+        return message
+
+
+class TokenBuffer(AsyncCallbackHandler):
+    """
+    Holds back tokens streamed by an LLM until they are released.
+
+    Attach it to a model call tagged "hold_tokens" (whose own token events the service
+    ignores). Once released, buffered and later tokens are dispatched as custom events
+    tagged "released_token", which the service streams to the client instead.
+
+    Tokens are kept as the raw chunk content, which is a list of content blocks for some
+    providers (e.g. Anthropic), so the service cleans them up the same way as streamed
+    tokens.
+    """
+
+    def __init__(self, config: RunnableConfig) -> None:
+        self.config = merge_configs(config, RunnableConfig(tags=["released_token"]))
+        self.tokens: deque[str | list[str | dict]] = deque()
+        self.released = False
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        chunk = kwargs.get("chunk")
+        content = chunk.message.content if chunk is not None else token
+        if not content:
+            return
+        if self.released:
+            await self._dispatch(content)
+        else:
+            self.tokens.append(content)
+
+    async def release(self) -> None:
+        # Tokens can keep arriving while the buffer is flushed, so only switch to
+        # dispatching directly once it is empty to keep them in order.
+        while self.tokens:
+            await self._dispatch(self.tokens.popleft())
+        self.released = True
+
+    async def _dispatch(self, content: str | list[str | dict]) -> None:
+        await adispatch_custom_event(name="token", data=content, config=self.config)
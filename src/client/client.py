@@ -1,9 +1,9 @@
-import json
 import os
 from collections.abc import AsyncGenerator, Generator
 from typing import Any
 
 import httpx
+import orjson
 
 from schema import (
     ChatHistory,
@@ -42,24 +42,45 @@ class AgentClient:
         """
         self.base_url = base_url
         self.auth_secret = os.getenv("AUTH_SECRET")
+        # AUTH_SECRET is only read here, so build the request headers once
+        self._headers: dict[str, str] = {}
+        if self.auth_secret:
+            self._headers["Authorization"] = f"Bearer {self.auth_secret}"
+        # Request bodies are serialized with model_dump_json(), so set the content type here
+        self._json_headers = {**self._headers, "Content-Type": "application/json"}
         self.timeout = timeout
         self.info: ServiceMetadata | None = None
         self.agent: str | None = None
+        # Created lazily and reused so sync calls share one connection pool (keep-alive).
+        # Async calls open a client per call, since callers like the Streamlit app run
+        # each interaction in a fresh event loop.
+        self._client: httpx.Client | None = None
         if get_info:
             self.retrieve_info()
         if agent:
             self.update_agent(agent)
 
     @property
-    def _headers(self) -> dict[str, str]:
-        headers = {}
-        if self.auth_secret:
-            headers["Authorization"] = f"Bearer {self.auth_secret}"
-        return headers
+    def _http(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client()
+        return self._client
+
+    def close(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def __enter__(self) -> "AgentClient":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
 
     def retrieve_info(self) -> None:
         try:
-            response = httpx.get(
+            response = self._http.get(
                 f"{self.base_url}/info",
                 headers=self._headers,
                 timeout=self.timeout,
@@ -68,7 +89,7 @@ class AgentClient:
         except httpx.HTTPError as e:
             raise AgentClientError(f"Error getting service info: {e}")
 
-        self.info: ServiceMetadata = ServiceMetadata.model_validate(response.json())
+        self.info: ServiceMetadata = ServiceMetadata.model_validate_json(response.content)
         if not self.agent or self.agent not in [a.key for a in self.info.agents]:
             self.agent = self.info.default_agent
 
@@ -104,15 +125,15 @@ class AgentClient:
             try:
                 response = await client.post(
                     f"{self.base_url}/{self.agent}/invoke",
-                    json=request.model_dump(),
-                    headers=self._headers,
+                    content=request.model_dump_json(),
+                    headers=self._json_headers,
                     timeout=self.timeout,
                 )
                 response.raise_for_status()
             except httpx.HTTPError as e:
                 raise AgentClientError(f"Error: {e}")
 
-        return ChatMessage.model_validate(response.json())
+        return ChatMessage.model_validate_json(response.content)
 
     def invoke(
         self, message: str, model: str | None = None, thread_id: str | None = None
@@ -136,17 +157,17 @@ class AgentClient:
         if model:
             request.model = model
         try:
-            response = httpx.post(
+            response = self._http.post(
                 f"{self.base_url}/{self.agent}/invoke",
-                json=request.model_dump(),
-                headers=self._headers,
+                content=request.model_dump_json(),
+                headers=self._json_headers,
                 timeout=self.timeout,
             )
             response.raise_for_status()
         except httpx.HTTPError as e:
             raise AgentClientError(f"Error: {e}")
 
-        return ChatMessage.model_validate(response.json())
+        return ChatMessage.model_validate_json(response.content)
 
     def _parse_stream_line(self, line: str) -> ChatMessage | str | None:
         line = line.strip()
@@ -155,7 +176,7 @@ class AgentClient:
             if data == "[DONE]":
                 return None
             try:
-                parsed = json.loads(data)
+                parsed = orjson.loads(data)
             except Exception as e:
                 raise Exception(f"Error JSON parsing message from server: {e}")
             match parsed["type"]:
@@ -204,11 +225,11 @@ class AgentClient:
         if model:
             request.model = model
         try:
-            with httpx.stream(
+            with self._http.stream(
                 "POST",
                 f"{self.base_url}/{self.agent}/stream",
-                json=request.model_dump(),
-                headers=self._headers,
+                content=request.model_dump_json(),
+                headers=self._json_headers,
                 timeout=self.timeout,
             ) as response:
                 response.raise_for_status()
@@ -257,8 +278,8 @@ class AgentClient:
                 async with client.stream(
                     "POST",
                     f"{self.base_url}/{self.agent}/stream",
-                    json=request.model_dump(),
-                    headers=self._headers,
+                    content=request.model_dump_json(),
+                    headers=self._json_headers,
                     timeout=self.timeout,
                 ) as response:
                     response.raise_for_status()
@@ -286,8 +307,8 @@ class AgentClient:
             try:
                 response = await client.post(
                     f"{self.base_url}/feedback",
-                    json=request.model_dump(),
-                    headers=self._headers,
+                    content=request.model_dump_json(),
+                    headers=self._json_headers,
                     timeout=self.timeout,
                 )
                 response.raise_for_status()
@@ -307,14 +328,14 @@ class AgentClient:
         """
         request = ChatHistoryInput(thread_id=thread_id)
         try:
-            response = httpx.post(
+            response = self._http.post(
                 f"{self.base_url}/history",
-                json=request.model_dump(),
-                headers=self._headers,
+                content=request.model_dump_json(),
+                headers=self._json_headers,
                 timeout=self.timeout,
             )
             response.raise_for_status()
         except httpx.HTTPError as e:
             raise AgentClientError(f"Error: {e}")
 
-        return ChatHistory.model_validate(response.json())
+        return ChatHistory.model_validate_json(response.content)
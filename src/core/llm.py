@@ -1,12 +1,5 @@
 from functools import cache
-from typing import TypeAlias
-
-from langchain_anthropic import ChatAnthropic
-from langchain_aws import ChatBedrock
-from langchain_community.chat_models import FakeListChatModel
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
+from typing import TYPE_CHECKING, TypeAlias
 
 from schema.models import (
     AllModelEnum,
@@ -32,11 +25,20 @@ _MODEL_TABLE = {
     FakeModelName.FAKE: "fake",
 }
 
-ModelT: TypeAlias = ChatOpenAI | ChatAnthropic | ChatGoogleGenerativeAI | ChatGroq | ChatBedrock
+# Provider packages are imported only when one of their models is requested, so the
+# service doesn't pay the import cost of SDKs it has no API key for.
+if TYPE_CHECKING:
+    from langchain_anthropic import ChatAnthropic
+    from langchain_aws import ChatBedrock
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_groq import ChatGroq
+    from langchain_openai import ChatOpenAI
+
+    ModelT: TypeAlias = ChatOpenAI | ChatAnthropic | ChatGoogleGenerativeAI | ChatGroq | ChatBedrock
 
 
 @cache
-def get_model(model_name: AllModelEnum, /) -> ModelT:
+def get_model(model_name: AllModelEnum, /) -> "ModelT":
     # NOTE: models with streaming=True will send tokens as they are generated
     # if the /stream endpoint is called with stream_tokens=True (the default)
     api_model_name = _MODEL_TABLE.get(model_name)
@@ -44,16 +46,28 @@ def get_model(model_name: AllModelEnum, /) -> ModelT:
         raise ValueError(f"Unsupported model: {model_name}")
 
     if model_name in OpenAIModelName:
+        from langchain_openai import ChatOpenAI
+
         return ChatOpenAI(model=api_model_name, temperature=0.5, streaming=True)
     if model_name in AnthropicModelName:
+        from langchain_anthropic import ChatAnthropic
+
         return ChatAnthropic(model=api_model_name, temperature=0.5, streaming=True)
     if model_name in GoogleModelName:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
         return ChatGoogleGenerativeAI(model=api_model_name, temperature=0.5, streaming=True)
     if model_name in GroqModelName:
+        from langchain_groq import ChatGroq
+
         if model_name == GroqModelName.LLAMA_GUARD_3_8B:
             return ChatGroq(model=api_model_name, temperature=0.0)
         return ChatGroq(model=api_model_name, temperature=0.5)
     if model_name in AWSModelName:
+        from langchain_aws import ChatBedrock
+
         return ChatBedrock(model_id=api_model_name, temperature=0.5)
     if model_name in FakeModelName:
+        from langchain_community.chat_models import FakeListChatModel
+
         return FakeListChatModel(responses=["This is a test response from the fake model."])
@@ -1,13 +1,15 @@
-import json
+import hmac
 import logging
 import warnings
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from functools import cache
 from typing import Annotated, Any
 from uuid import UUID, uuid4
 
+import orjson
 from fastapi import APIRouter, Depends, FastAPI, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from langchain_core._api import LangChainBetaWarning
 from langchain_core.messages import AnyMessage, HumanMessage
@@ -47,7 +49,10 @@ def verify_bearer(
     if not settings.AUTH_SECRET:
         return
     auth_secret = settings.AUTH_SECRET.get_secret_value()
-    if not http_auth or http_auth.credentials != auth_secret:
+    # Constant-time comparison so the secret can't be probed via response timing
+    if not http_auth or not hmac.compare_digest(
+        http_auth.credentials.encode(), auth_secret.encode()
+    ):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
 
 
@@ -64,7 +69,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # context manager will clean up the AsyncSqliteSaver on exit
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 router = APIRouter(dependencies=[Depends(verify_bearer)])
 
 
@@ -114,9 +119,14 @@ async def invoke(user_input: UserInput, agent_id: str = DEFAULT_AGENT) -> ChatMe
         raise HTTPException(status_code=500, detail="Unexpected error")
 
 
+def _sse_event(data: dict[str, Any]) -> bytes:
+    # Encode straight to bytes so StreamingResponse doesn't need to re-encode each frame
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+
 async def message_generator(
     user_input: StreamInput, agent_id: str = DEFAULT_AGENT
-) -> AsyncGenerator[str, None]:
+) -> AsyncGenerator[bytes, None]:
     """
     Generate a stream of messages from the agent.
 
@@ -151,28 +161,45 @@ async def message_generator(
                 chat_message.run_id = str(run_id)
             except Exception as e:
                 logger.error(f"Error parsing message: {e}")
-                yield f"data: {json.dumps({'type': 'error', 'content': 'Unexpected error'})}\n\n"
+                yield _sse_event({"type": "error", "content": "Unexpected error"})
                 continue
             # LangGraph re-sends the input message, which feels weird, so drop it
             if chat_message.type == "human" and chat_message.content == user_input.message:
                 continue
-            yield f"data: {json.dumps({'type': 'message', 'content': chat_message.model_dump()})}\n\n"
+            # Splice the pydantic-serialized message in directly rather than dumping it to a
+            # dict and encoding it a second time.
+            yield (
+                b'data: {"type":"message","content":'
+                + chat_message.model_dump_json().encode()
+                + b"}\n\n"
+            )
+
+        # Yield tokens that were held back until a safety check passed.
+        # See agents.utils.TokenBuffer.
+        if event["event"] == "on_custom_event" and "released_token" in event.get("tags", []):
+            token = convert_message_content_to_string(remove_tool_calls(event["data"]))
+            if user_input.stream_tokens and token:
+                yield _sse_event({"type": "token", "content": token})
+            continue
 
         # Yield tokens streamed from LLMs.
         if (
             event["event"] == "on_chat_model_stream"
             and user_input.stream_tokens
             and "llama_guard" not in event.get("tags", [])
+            and "hold_tokens" not in event.get("tags", [])
         ):
             content = remove_tool_calls(event["data"]["chunk"].content)
             if content:
                 # Empty content in the context of OpenAI usually means
                 # that the model is asking for a tool to be invoked.
                 # So we only print non-empty content.
-                yield f"data: {json.dumps({'type': 'token', 'content': convert_message_content_to_string(content)})}\n\n"
+                yield _sse_event(
+                    {"type": "token", "content": convert_message_content_to_string(content)}
+                )
             continue
 
-    yield "data: [DONE]\n\n"
+    yield b"data: [DONE]\n\n"
 
 
 def _sse_response_example() -> dict[int, Any]:
@@ -209,6 +236,12 @@ async def stream(user_input: StreamInput, agent_id: str = DEFAULT_AGENT) -> Stre
     )
 
 
+@cache
+def get_langsmith_client() -> LangsmithClient:
+    # The client reads its config and sets up an HTTP session on creation, so share one
+    return LangsmithClient()
+
+
 @router.post("/feedback")
 async def feedback(feedback: Feedback) -> FeedbackResponse:
     """
@@ -218,7 +251,7 @@ async def feedback(feedback: Feedback) -> FeedbackResponse:
     credentials can be stored and managed in the service rather than the client.
     See: https://api.smith.langchain.com/redoc#tag/feedback/operation/create_feedback_api_v1_feedback_post
     """
-    client = LangsmithClient()
+    client = get_langsmith_client()
     kwargs = feedback.kwargs or {}
     client.create_feedback(
         run_id=feedback.run_id,
@@ -0,0 +1,113 @@
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agents import llama_guard
+from agents.llama_guard import LlamaGuard, SafetyAssessment
+
+
+@pytest.fixture
+def mock_guard_model():
+    """Fixture for a LlamaGuard backed by a mock model, with an empty verdict cache."""
+    model = Mock()
+    model.with_config.return_value = model
+    with (
+        patch("agents.llama_guard.settings") as mock_settings,
+        patch("agents.llama_guard.get_model", return_value=model),
+        patch.dict(llama_guard._verdict_cache, clear=True),
+    ):
+        mock_settings.GROQ_API_KEY = "test_key"
+        yield model
+
+
+@pytest.mark.asyncio
+async def test_ainvoke_caches_verdict(mock_guard_model):
+    mock_guard_model.ainvoke = AsyncMock(return_value=AIMessage(content="safe"))
+    messages = [HumanMessage(content="What is the weather in Tokyo?")]
+
+    first = await LlamaGuard().ainvoke("User", messages)
+    second = await LlamaGuard().ainvoke("User", messages)
+
+    assert first.safety_assessment == SafetyAssessment.SAFE
+    assert second == first
+    mock_guard_model.ainvoke.assert_awaited_once()
+
+    # A different role compiles to a different prompt, so it is not a cache hit
+    await LlamaGuard().ainvoke("Agent", messages)
+    assert mock_guard_model.ainvoke.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_ainvoke_does_not_cache_errors(mock_guard_model):
+    mock_guard_model.ainvoke = AsyncMock(return_value=AIMessage(content="not a verdict"))
+    messages = [HumanMessage(content="Hello")]
+
+    output = await LlamaGuard().ainvoke("User", messages)
+    assert output.safety_assessment == SafetyAssessment.ERROR
+    await LlamaGuard().ainvoke("User", messages)
+    assert mock_guard_model.ainvoke.await_count == 2
+
+
+def test_invoke_caches_unsafe_verdict(mock_guard_model):
+    mock_guard_model.invoke = Mock(return_value=AIMessage(content="unsafe\nS1,S10"))
+    messages = [HumanMessage(content="Some unsafe request")]
+
+    first = LlamaGuard().invoke("User", messages)
+    second = LlamaGuard().invoke("User", messages)
+
+    assert first.safety_assessment == SafetyAssessment.UNSAFE
+    assert first.unsafe_categories == ["Violent Crimes", "Hate"]
+    assert second == first
+    mock_guard_model.invoke.assert_called_once()
+
+
+def test_compile_prompt(mock_guard_model):
+    messages = [
+        HumanMessage(content="Format this: {name}"),
+        AIMessage(content="Sure, {name} it is."),
+    ]
+    prompt = LlamaGuard()._compile_prompt("Agent", messages)
+    assert "in 'Agent' messages" in prompt
+    assert "S10: Hate." in prompt
+    assert "User: Format this: {name}\n\nAgent: Sure, {name} it is." in prompt
+    assert prompt.endswith("a comma-separated list of violated categories.")
+
+
+@pytest.mark.parametrize(
+    "output, expected_assessment, expected_categories",
+    [
+        ("safe", SafetyAssessment.SAFE, []),
+        ("unsafe\nS1", SafetyAssessment.UNSAFE, ["Violent Crimes"]),
+        (
+            "unsafe\r\nS2, S14",
+            SafetyAssessment.UNSAFE,
+            ["Non-Violent Crimes", "Code Interpreter Abuse"],
+        ),
+        ("unsafe\nS99", SafetyAssessment.ERROR, []),
+        ("unsafe", SafetyAssessment.ERROR, []),
+        ("I cannot answer that", SafetyAssessment.ERROR, []),
+    ],
+)
+def test_parse_llama_guard_output(output, expected_assessment, expected_categories):
+    parsed = llama_guard.parse_llama_guard_output(output)
+    assert parsed.safety_assessment == expected_assessment
+    assert parsed.unsafe_categories == expected_categories
+
+
+@pytest.mark.asyncio
+async def test_ainvoke_skips_when_nothing_to_check(mock_guard_model):
+    mock_guard_model.ainvoke = AsyncMock(return_value=AIMessage(content="unsafe\nS1"))
+    guard = LlamaGuard()
+
+    output = await guard.ainvoke("User", [])
+    assert output.safety_assessment == SafetyAssessment.SAFE
+
+    messages = [
+        HumanMessage(content="What is 2 + 2?"),
+        AIMessage(content="", tool_calls=[{"name": "Calculator", "args": {}, "id": "call_1"}]),
+        ToolMessage(content="4", tool_call_id="call_1"),
+    ]
+    output = await guard.ainvoke("Agent", messages)
+    assert output.safety_assessment == SafetyAssessment.SAFE
+    mock_guard_model.ainvoke.assert_not_awaited()
@@ -0,0 +1,255 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolCall, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from agents.llama_guard import LlamaGuardOutput, SafetyAssessment
+from agents.research_assistant import acall_model
+from agents.utils import TokenBuffer
+from schema import StreamInput
+from service.service import message_generator
+
+SAFE = LlamaGuardOutput(safety_assessment=SafetyAssessment.SAFE)
+UNSAFE = LlamaGuardOutput(safety_assessment=SafetyAssessment.UNSAFE, unsafe_categories=["Hate"])
+FLAGGED = "This conversation was flagged for unsafe content: Hate"
+CONFIG = {"configurable": {}}
+
+
+@pytest.fixture
+def mock_guard():
+    """Fixture to replace the research assistant's LlamaGuard."""
+    guard = Mock()
+    with patch("agents.research_assistant.llama_guard", guard):
+        yield guard
+
+
+@pytest.fixture
+def mock_model():
+    """Fixture to replace the research assistant's model runnable."""
+    model = Mock()
+    with patch("agents.research_assistant.get_model_runnable", return_value=model):
+        yield model
+
+
+class ListContentChatModel(BaseChatModel):
+    """Fake model streaming list content blocks, the way Anthropic models do."""
+
+    chunks: list[list[dict]]
+
+    @property
+    def _llm_type(self) -> str:
+        return "list-content-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        content = [block for chunk in self.chunks for block in chunk]
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self.chunks:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+
+def streaming_model(model: BaseChatModel, model_done: asyncio.Event) -> Runnable:
+    """Wrap a fake model so model_done is set once it has streamed all of its tokens."""
+
+    def mark_done(response: AIMessage) -> AIMessage:
+        model_done.set()
+        return response
+
+    return RunnableLambda(lambda state: state["messages"]) | model | RunnableLambda(mark_done)
+
+
+def guard_with_input_verdict(verdict: LlamaGuardOutput, model_done: asyncio.Event):
+    async def ainvoke(role, messages):
+        if role == "User":
+            # Only respond once the model has streamed everything
+            await model_done.wait()
+            return verdict
+        return SAFE
+
+    return ainvoke
+
+
+@pytest.fixture
+def token_buffers():
+    """Fixture recording the TokenBuffers created by the research assistant."""
+    buffers = []
+
+    class RecordingTokenBuffer(TokenBuffer):
+        def __init__(self, config) -> None:
+            super().__init__(config)
+            buffers.append(self)
+
+    with patch("agents.research_assistant.TokenBuffer", RecordingTokenBuffer):
+        yield buffers
+
+
+async def collect_stream(message: str) -> list[dict]:
+    user_input = StreamInput(message=message, stream_tokens=True)
+    events = []
+    async for frame in message_generator(user_input, "research-assistant"):
+        data = frame.decode().removeprefix("data: ").strip()
+        if data != "[DONE]":
+            events.append(json.loads(data))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_unsafe_input_discards_response(mock_guard, mock_model):
+    mock_guard.ainvoke = AsyncMock(return_value=UNSAFE)
+    mock_model.ainvoke = AsyncMock(return_value=AIMessage(content="Sure, here's how."))
+
+    result = await acall_model(
+        {"messages": [HumanMessage(content="Something unsafe")], "remaining_steps": 10}, CONFIG
+    )
+
+    assert result["messages"][0].content == FLAGGED
+    assert result["safety"] == UNSAFE
+    mock_guard.ainvoke.assert_awaited_once()
+    assert mock_guard.ainvoke.await_args.args[0] == "User"
+
+
+@pytest.mark.asyncio
+async def test_tool_result_skips_input_check(mock_guard, mock_model):
+    response = AIMessage(content="The answer is 42")
+    mock_guard.ainvoke = AsyncMock(return_value=SAFE)
+    mock_model.ainvoke = AsyncMock(return_value=response)
+    messages = [
+        HumanMessage(content="What is 6 * 7?"),
+        AIMessage(content="", tool_calls=[ToolCall(name="Calculator", args={}, id="call_id")]),
+        ToolMessage(content="42", tool_call_id="call_id"),
+    ]
+
+    result = await acall_model({"messages": messages, "remaining_steps": 10}, CONFIG)
+
+    assert result == {"messages": [response], "safety": SAFE}
+    assert [call.args[0] for call in mock_guard.ainvoke.await_args_list] == ["Agent"]
+
+
+@pytest.mark.asyncio
+async def test_unsafe_output_is_blocked(mock_guard, mock_model):
+    mock_guard.ainvoke = AsyncMock(side_effect=[SAFE, UNSAFE])
+    mock_model.ainvoke = AsyncMock(return_value=AIMessage(content="Something unsafe"))
+
+    result = await acall_model(
+        {"messages": [HumanMessage(content="Hello")], "remaining_steps": 10}, CONFIG
+    )
+
+    assert result["messages"][0].content == FLAGGED
+    assert result["safety"] == UNSAFE
+
+
+@pytest.mark.asyncio
+async def test_failed_input_check_cancels_model(mock_guard, mock_model):
+    cancelled = asyncio.Event()
+
+    async def slow_model(state, config):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def failing_guard(role, messages):
+        # Fail once the model call is underway
+        await asyncio.sleep(0.01)
+        raise RuntimeError("rate limited")
+
+    mock_guard.ainvoke = failing_guard
+    mock_model.ainvoke = slow_model
+
+    with pytest.raises(RuntimeError, match="rate limited"):
+        await acall_model(
+            {"messages": [HumanMessage(content="Hello")], "remaining_steps": 10}, CONFIG
+        )
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_node_cancels_model(mock_guard, mock_model):
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def slow_model(state, config):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    mock_guard.ainvoke = AsyncMock(return_value=SAFE)
+    mock_model.ainvoke = slow_model
+
+    # Cancel the node while it waits on the model after the input check passed
+    node = asyncio.create_task(
+        acall_model({"messages": [HumanMessage(content="Hello")], "remaining_steps": 10}, CONFIG)
+    )
+    await started.wait()
+    node.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await node
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_unsafe_input_streams_no_tokens(mock_guard, token_buffers):
+    model_done = asyncio.Event()
+    mock_guard.ainvoke = guard_with_input_verdict(UNSAFE, model_done)
+    message = AIMessage(
+        content="Here is how to do the unsafe thing",
+        tool_calls=[ToolCall(name="WebSearch", args={"query": "unsafe"}, id="call_id")],
+    )
+    model = streaming_model(GenericFakeChatModel(messages=iter([message])), model_done)
+
+    with patch("agents.research_assistant.get_model_runnable", return_value=model):
+        events = await collect_stream("Something unsafe")
+
+    # The model did stream its answer, but it was held back and never released
+    assert "".join(token_buffers[0].tokens) == "Here is how to do the unsafe thing"
+    assert not token_buffers[0].released
+    assert [e for e in events if e["type"] == "token"] == []
+    messages = [e["content"] for e in events if e["type"] == "message"]
+    assert [(m["type"], m["content"]) for m in messages] == [("ai", FLAGGED)]
+    assert messages[0]["tool_calls"] == []
+
+
+@pytest.mark.asyncio
+async def test_safe_input_streams_tokens_after_check(mock_guard):
+    model_done = asyncio.Event()
+    mock_guard.ainvoke = guard_with_input_verdict(SAFE, model_done)
+    message = AIMessage(content="The weather in Tokyo is sunny")
+    model = streaming_model(GenericFakeChatModel(messages=iter([message])), model_done)
+
+    with patch("agents.research_assistant.get_model_runnable", return_value=model):
+        events = await collect_stream("What is the weather in Tokyo?")
+
+    tokens = "".join(e["content"] for e in events if e["type"] == "token")
+    assert tokens == "The weather in Tokyo is sunny"
+    messages = [e["content"] for e in events if e["type"] == "message"]
+    assert messages[-1]["content"] == "The weather in Tokyo is sunny"
+
+
+@pytest.mark.asyncio
+async def test_safe_input_streams_list_content_tokens(mock_guard):
+    model_done = asyncio.Event()
+    mock_guard.ainvoke = guard_with_input_verdict(SAFE, model_done)
+    chunks = [
+        [{"type": "text", "text": "The weather ", "index": 0}],
+        [{"type": "text", "text": "is sunny", "index": 0}],
+        [{"type": "tool_use", "id": "call_id", "name": "Weather", "input": {}, "index": 1}],
+        [{"type": "input_json_delta", "partial_json": '{"city": "Tokyo"}', "index": 2}],
+    ]
+    model = streaming_model(ListContentChatModel(chunks=chunks), model_done)
+
+    with patch("agents.research_assistant.get_model_runnable", return_value=model):
+        events = await collect_stream("What is the weather in Tokyo?")
+
+    tokens = [e["content"] for e in events if e["type"] == "token"]
+    assert tokens == ["The weather ", "is sunny"]
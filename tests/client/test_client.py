@@ -39,6 +39,25 @@ def test_headers(mock_env):
     with patch.dict(os.environ, {"AUTH_SECRET": "test-secret"}, clear=True):
         client = AgentClient(get_info=False)
         assert client._headers == {"Authorization": "Bearer test-secret"}
+        assert client._json_headers == {
+            "Authorization": "Bearer test-secret",
+            "Content-Type": "application/json",
+        }
+
+
+def test_http_client_reuse(mock_env):
+    """Test that sync requests share one HTTP client until it is closed."""
+    client = AgentClient(get_info=False)
+    http_client = client._http
+    assert client._http is http_client
+
+    client.close()
+    assert http_client.is_closed
+    assert client._http is not http_client
+
+    with AgentClient(get_info=False) as client:
+        http_client = client._http
+    assert http_client.is_closed
 
 
 def test_invoke(agent_client):
@@ -53,14 +72,14 @@ def test_invoke(agent_client):
         json={"type": "ai", "content": ANSWER},
         request=mock_request,
     )
-    with patch("httpx.post", return_value=mock_response):
+    with patch("httpx.Client.post", return_value=mock_response):
         response = agent_client.invoke(QUESTION)
         assert isinstance(response, ChatMessage)
         assert response.type == "ai"
         assert response.content == ANSWER
 
     # Test with model and thread_id
-    with patch("httpx.post", return_value=mock_response) as mock_post:
+    with patch("httpx.Client.post", return_value=mock_response) as mock_post:
         response = agent_client.invoke(
             QUESTION,
             model="gpt-4o",
@@ -69,13 +88,15 @@ def test_invoke(agent_client):
         assert isinstance(response, ChatMessage)
         # Verify request
         args, kwargs = mock_post.call_args
-        assert kwargs["json"]["message"] == QUESTION
-        assert kwargs["json"]["model"] == "gpt-4o"
-        assert kwargs["json"]["thread_id"] == "test-thread"
+        assert kwargs["headers"]["Content-Type"] == "application/json"
+        body = json.loads(kwargs["content"])
+        assert body["message"] == QUESTION
+        assert body["model"] == "gpt-4o"
+        assert body["thread_id"] == "test-thread"
 
     # Test error response
     error_response = Response(500, text="Internal Server Error", request=mock_request)
-    with patch("httpx.post", return_value=error_response):
+    with patch("httpx.Client.post", return_value=error_response):
         with pytest.raises(AgentClientError) as exc:
             agent_client.invoke(QUESTION)
         assert "500 Internal Server Error" in str(exc.value)
@@ -108,9 +129,11 @@ async def test_ainvoke(agent_client):
         assert response.content == ANSWER
         # Verify request
         args, kwargs = mock_post.call_args
-        assert kwargs["json"]["message"] == QUESTION
-        assert kwargs["json"]["model"] == "gpt-4o"
-        assert kwargs["json"]["thread_id"] == "test-thread"
+        assert kwargs["headers"]["Content-Type"] == "application/json"
+        body = json.loads(kwargs["content"])
+        assert body["message"] == QUESTION
+        assert body["model"] == "gpt-4o"
+        assert body["thread_id"] == "test-thread"
 
     # Test error response
     error_response = Response(500, text="Internal Server Error", request=mock_request)
@@ -143,7 +166,7 @@ def test_stream(agent_client):
     mock_response.__enter__ = Mock(return_value=mock_response)
     mock_response.__exit__ = Mock(return_value=None)
 
-    with patch("httpx.stream", return_value=mock_response):
+    with patch("httpx.Client.stream", return_value=mock_response):
         # Collect all streamed responses
         responses = list(agent_client.stream(QUESTION))
 
@@ -165,7 +188,7 @@ def test_stream(agent_client):
     error_response_mock = Mock()
     error_response_mock.__enter__ = Mock(return_value=error_response)
     error_response_mock.__exit__ = Mock(return_value=None)
-    with patch("httpx.stream", return_value=error_response_mock):
+    with patch("httpx.Client.stream", return_value=error_response_mock):
         with pytest.raises(AgentClientError) as exc:
             list(agent_client.stream(QUESTION))
         assert "500 Internal Server Error" in str(exc.value)
@@ -250,10 +273,11 @@ async def test_acreate_feedback(agent_client):
         await agent_client.acreate_feedback(RUN_ID, KEY, SCORE, KWARGS)
         # Verify request
         args, kwargs = mock_post.call_args
-        assert kwargs["json"]["run_id"] == RUN_ID
-        assert kwargs["json"]["key"] == KEY
-        assert kwargs["json"]["score"] == SCORE
-        assert kwargs["json"]["kwargs"] == KWARGS
+        body = json.loads(kwargs["content"])
+        assert body["run_id"] == RUN_ID
+        assert body["key"] == KEY
+        assert body["score"] == SCORE
+        assert body["kwargs"] == KWARGS
 
     # Test error response
     error_response = Response(
@@ -277,7 +301,7 @@ def test_get_history(agent_client):
 
     # Mock successful response
     mock_response = Response(200, json=HISTORY, request=Request("POST", "http://test/history"))
-    with patch("httpx.post", return_value=mock_response):
+    with patch("httpx.Client.post", return_value=mock_response):
         history = agent_client.get_history(THREAD_ID)
         assert isinstance(history, ChatHistory)
         assert len(history.messages) == 2
@@ -288,7 +312,7 @@ def test_get_history(agent_client):
     error_response = Response(
         500, text="Internal Server Error", request=Request("POST", "http://test/history")
     )
-    with patch("httpx.post", return_value=error_response):
+    with patch("httpx.Client.post", return_value=error_response):
         with pytest.raises(AgentClientError) as exc:
             agent_client.get_history(THREAD_ID)
         assert "500 Internal Server Error" in str(exc.value)
@@ -310,7 +334,7 @@ def test_info(agent_client):
     )
 
     # Update an existing client with info
-    with patch("httpx.get", return_value=test_response):
+    with patch("httpx.Client.get", return_value=test_response):
         agent_client.retrieve_info()
 
     assert agent_client.info == test_info
@@ -322,7 +346,7 @@ def test_info(agent_client):
     assert "Agent unknown-agent not found in available agents: custom-agent" in str(exc.value)
 
     # Test a fresh client with info
-    with patch("httpx.get", return_value=test_response):
+    with patch("httpx.Client.get", return_value=test_response):
         agent_client = AgentClient(base_url="http://test")
     assert agent_client.info == test_info
     assert agent_client.agent == "custom-agent"
@@ -5,9 +5,10 @@ from fastapi.testclient import TestClient
 from langchain_core.messages import AIMessage
 
 from service import app
+from service.service import get_langsmith_client
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def test_client():
     """Fixture to create a FastAPI test client."""
     return TestClient(app)
@@ -23,6 +24,15 @@ def mock_agent():
         yield agent_mock
 
 
+@pytest.fixture
+def mock_langsmith_client():
+    """Patch the LangSmith client, clearing the cached instance so the mock doesn't leak."""
+    get_langsmith_client.cache_clear()
+    with patch("service.service.LangsmithClient") as mock_client:
+        yield mock_client
+    get_langsmith_client.cache_clear()
+
+
 @pytest.fixture
 def mock_settings(mock_env):
     """Fixture to ensure settings are clean for each test."""
@@ -32,20 +42,8 @@ def mock_settings(mock_env):
 
 @pytest.fixture
 def mock_httpx():
-    """Patch httpx.stream and httpx.get to use our test client."""
+    """Patch httpx.Client so AgentClient's sync requests go to our test client."""
 
     with TestClient(app) as client:
-
-        def mock_stream(method: str, url: str, **kwargs):
-            # Strip the base URL since TestClient expects just the path
-            path = url.replace("http://localhost", "")
-            return client.stream(method, path, **kwargs)
-
-        def mock_get(url: str, **kwargs):
-            # Strip the base URL since TestClient expects just the path
-            path = url.replace("http://localhost", "")
-            return client.get(path, **kwargs)
-
-        with patch("httpx.stream", mock_stream):
-            with patch("httpx.get", mock_get):
-                yield
+        with patch("httpx.Client", return_value=client):
+            yield
@@ -91,9 +91,8 @@ def test_invoke_model_param(test_client, mock_agent) -> None:
     assert response.status_code == 422
 
 
-@patch("service.service.LangsmithClient")
-def test_feedback(mock_client: langsmith.Client, test_client) -> None:
-    ls_instance = mock_client.return_value
+def test_feedback(mock_langsmith_client: langsmith.Client, test_client) -> None:
+    ls_instance = mock_langsmith_client.return_value
     ls_instance.create_feedback.return_value = None
     body = {
         "run_id": "847c6285-8fc9-4560-a83f-4e6285809254",
@@ -108,6 +107,7 @@ def test_feedback(mock_client: langsmith.Client, test_client) -> None:
         key="human-feedback-stars",
         score=0.8,
     )
+    mock_langsmith_client.assert_called_once()
 
 
 def test_history(test_client, mock_agent) -> None: